@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
-from app.core import storage, auth_utils
+from app.core import storage, auth_utils, search_index, stats
+from app.api.routes.roadmap import RoadmapSearchResult
 
 router = APIRouter()
 
@@ -14,6 +16,24 @@ class UserListResponse(BaseModel):
     is_agent_enabled: bool
     created_at: str
 
+class DailyStats(BaseModel):
+    day: str
+    signups: int
+    roadmaps: int
+    generations: int
+    credits_consumed: int
+
+class StatsResponse(BaseModel):
+    users_total: int
+    admins_total: int
+    blocked_users: int
+    agent_disabled_users: int
+    roadmaps_total: int
+    generations_total: int
+    credits_consumed: int
+    roadmaps_per_user: float
+    daily: List[DailyStats]
+
 class UpdateCreditsRequest(BaseModel):
     credits: int
 
@@ -34,6 +54,13 @@ def require_admin(authorization: Optional[str] = Header(None)):
     
     return current_user
 
+@router.get("/stats", response_model=StatsResponse)
+async def get_stats(days: int = Query(30, ge=1, le=365), authorization: Optional[str] = Header(None)):
+    """Usage statistics from precomputed counters (admin only)"""
+    require_admin(authorization)
+    
+    return stats.get_stats(days)
+
 @router.get("/users", response_model=List[UserListResponse])
 async def list_users(authorization: Optional[str] = Header(None)):
     """List all users (admin only)"""
@@ -132,3 +159,15 @@ async def toggle_user_agent(user_id: str, request: ToggleAgentRequest, authoriza
     
     storage.update_user(user_id, {"is_agent_enabled": request.is_enabled})
     return {"message": "Agent status updated"}
+
+@router.get("/roadmaps/search", response_model=List[RoadmapSearchResult])
+async def search_all_roadmaps(
+    q: str = Query(..., min_length=1),
+    user_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    authorization: Optional[str] = Header(None),
+):
+    """Full-text search across all users' roadmaps (admin only)"""
+    require_admin(authorization)
+    
+    return await run_in_threadpool(search_index.search, q, user_id=user_id, limit=limit)
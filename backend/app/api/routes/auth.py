@@ -28,14 +28,16 @@ class UserResponse(BaseModel):
 @router.post("/signup", response_model=TokenResponse)
 async def signup(request: SignupRequest):
     """Create a new user account"""
-    # Check if user already exists
+    # Check if user already exists (cheap early exit before hashing)
     existing_user = storage.get_user_by_email(request.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Hash password and create user
+    # Hash password and create user; create_user re-checks the email under the storage lock
     password_hash = auth_utils.hash_password(request.password)
     user = storage.create_user(request.email, password_hash)
+    if not user:
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create token
     token = auth_utils.create_access_token(user["id"], user["email"], user["is_admin"])
@@ -104,15 +106,15 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
         "created_at": user["created_at"]
     }
 
-# Initialize admin user on startup
+# Initialize admin user on startup (called from main.bootstrap)
 def init_admin():
     admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
     admin_password = os.getenv("ADMIN_PASSWORD", "admin123")
     
-    existing_admin = storage.get_user_by_email(admin_email)
-    if not existing_admin:
-        password_hash = auth_utils.hash_password(admin_password)
-        storage.create_user(admin_email, password_hash, is_admin=True)
-        print(f"✅ Admin user created: {admin_email}")
-
-init_admin()
+    # Check-and-create under the storage lock so concurrent workers can't both create it
+    with storage.locked():
+        existing_admin = storage.get_user_by_email(admin_email)
+        if not existing_admin:
+            password_hash = auth_utils.hash_password(admin_password)
+            storage.create_user(admin_email, password_hash, is_admin=True)
+            print(f"✅ Admin user created: {admin_email}")
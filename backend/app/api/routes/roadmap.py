@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Query, Response
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from app.services.ai_gateway import generate_roadmap_stream
-from app.core import storage, auth_utils
+from app.services import generation_jobs
+from app.core import storage, auth_utils, search_index, stats
 
 router = APIRouter()
 
@@ -26,9 +28,43 @@ class RoadmapResponse(BaseModel):
     roadmap_data: dict
     created_at: str
 
-@router.post("/generate")
-async def generate_roadmap(request: GenerateRoadmapRequest, authorization: Optional[str] = Header(None)):
-    """Generate a learning roadmap using AI with credit and agent status checks"""
+class RoadmapSearchResult(BaseModel):
+    id: str
+    user_id: str
+    title: str
+    user_goal: str
+    skill_level: str
+    created_at: str
+    score: float
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    roadmap_id: Optional[str] = None
+    error: Optional[str] = None
+    next_offset: int
+
+@router.post(
+    "/generate",
+    responses={
+        200: {"content": {"text/event-stream": {}}, "description": "Streamed roadmap"},
+        202: {"model": JobResponse, "description": "Background job started (`?async=1`)"},
+    },
+)
+async def generate_roadmap(
+    request: GenerateRoadmapRequest,
+    response: Response,
+    authorization: Optional[str] = Header(None),
+    run_async: bool = Query(False, alias="async"),
+    save: bool = Query(False),
+):
+    """
+    Generate a learning roadmap using AI with credit and agent status checks.
+
+    With `?async=1` generation runs as a background job and the job is
+    returned with 202; stream it from `/jobs/{job_id}/stream`. Add `save=1` to store
+    the finished roadmap automatically.
+    """
     if not authorization:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
@@ -57,9 +93,15 @@ async def generate_roadmap(request: GenerateRoadmapRequest, authorization: Optio
     goal = request.user_goal or request.prompt
     print(f"Received request from {user['email']}: {goal}, {request.skill_level}")
     
-    # Decrement credit if not infinite
-    if credits != -1:
-        storage.update_user(user["id"], {"credits": credits - 1})
+    # Decrement credit if not infinite (atomic across workers)
+    if not storage.consume_credit(user["id"]):
+        raise HTTPException(status_code=403, detail="You have exhausted your credits. Please contact admin for more.")
+    stats.generation_started()
+
+    if run_async:
+        job = await generation_jobs.start_job(user["id"], goal, request.skill_level, auto_save=save)
+        response.status_code = 202
+        return job.to_dict()
 
     try:
         return StreamingResponse(
@@ -72,6 +114,43 @@ async def generate_roadmap(request: GenerateRoadmapRequest, authorization: Optio
         # For now keep it simple.
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _get_owned_job(job_id: str, authorization: Optional[str]):
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    current_user = auth_utils.get_current_user_from_token(authorization)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    job = await generation_jobs.get_job(job_id)
+    if not job or job["user_id"] != current_user["user_id"]:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, authorization: Optional[str] = Header(None)):
+    """Get the status of a background generation job"""
+    return await _get_owned_job(job_id, authorization)
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_job(
+    job_id: str,
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[int] = Header(None),
+    offset: Optional[int] = Query(None, ge=0),
+):
+    """Stream a job's output, resuming after `Last-Event-ID` or from `offset`"""
+    job = await _get_owned_job(job_id, authorization)
+    
+    if offset is None:
+        offset = last_event_id + 1 if last_event_id is not None else 0
+    
+    if offset < job["base"]:
+        raise HTTPException(status_code=410, detail="Requested offset is no longer buffered")
+    
+    return StreamingResponse(generation_jobs.stream_job(job_id, offset), media_type="text/event-stream")
+
 @router.post("/save", response_model=RoadmapResponse)
 async def save_roadmap(request: SaveRoadmapRequest, authorization: Optional[str] = Header(None)):
     """Save a generated roadmap to user's account"""
@@ -105,6 +184,22 @@ async def list_roadmaps(authorization: Optional[str] = Header(None)):
     roadmaps = storage.get_roadmaps_by_user(current_user["user_id"])
     return roadmaps
 
+@router.get("/search", response_model=List[RoadmapSearchResult])
+async def search_roadmaps(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    authorization: Optional[str] = Header(None),
+):
+    """Full-text search over the current user's roadmaps"""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    current_user = auth_utils.get_current_user_from_token(authorization)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    return await run_in_threadpool(search_index.search, q, user_id=current_user["user_id"], limit=limit)
+
 @router.get("/{roadmap_id}", response_model=RoadmapResponse)
 async def get_roadmap(roadmap_id: str, authorization: Optional[str] = Header(None)):
     """Get a specific roadmap by ID"""
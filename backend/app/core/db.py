@@ -1,10 +1,13 @@
 import os
-from supabase import create_client, Client
+from functools import lru_cache
 from dotenv import load_dotenv
 
-load_dotenv()
+@lru_cache(maxsize=1)
+def get_supabase():
+    """Build the Supabase client on first use; the SDK is slow to import."""
+    from supabase import create_client
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_SERVICE_KEY")
-
-supabase: Client = create_client(url, key)
+    load_dotenv()
+    url: str = os.environ.get("SUPABASE_URL")
+    key: str = os.environ.get("SUPABASE_SERVICE_KEY")
+    return create_client(url, key)
@@ -0,0 +1,158 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core import auth_utils
+
+class RateLimitPolicy(NamedTuple):
+    name: str
+    capacity: int       # burst size
+    per_seconds: float  # time to refill the whole bucket
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+# (method, path) -> policy. Routes not listed here are not limited.
+DEFAULT_POLICIES: Dict[Tuple[str, str], RateLimitPolicy] = {
+    # bcrypt makes every attempt CPU-heavy
+    ("POST", "/api/auth/login"): RateLimitPolicy("login", 10, 60),
+    ("POST", "/api/auth/signup"): RateLimitPolicy("signup", 5, 300),
+    # Each call costs upstream LLM quota
+    ("POST", "/api/roadmap/generate"): RateLimitPolicy("generate", 5, 300),
+}
+
+class _MemoryBuckets:
+    """
+    Token buckets for a single process.
+
+    One [tokens, updated_at] pair per active key, kept in LRU order so idle
+    keys can be evicted from the front in amortized O(1).
+    """
+
+    def __init__(self, idle_seconds: float, max_keys: int):
+        self.idle_seconds = idle_seconds
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def take(self, key: str, rate: float, capacity: float) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = [float(capacity), now]
+            self.buckets[key] = bucket
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            self.buckets.move_to_end(key)
+
+        allowed = bucket[0] >= 1
+        if allowed:
+            bucket[0] -= 1
+
+        self._evict(now)
+        retry_after = 0.0 if bucket[0] >= 1 else (1 - bucket[0]) / rate
+        return allowed, bucket[0], retry_after
+
+    def _evict(self, now: float):
+        while self.buckets:
+            oldest_key, (_, updated_at) = next(iter(self.buckets.items()))
+            if now - updated_at < self.idle_seconds and len(self.buckets) <= self.max_keys:
+                break
+            del self.buckets[oldest_key]
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying per-route token-bucket limits.
+
+    Buckets are keyed by the JWT user id when a valid token is sent, otherwise
+    by client IP. With `shared=True` (the default whenever several workers
+    run) buckets live in the SQLite shared state so the limit holds across
+    all workers on the host.
+    """
+
+    def __init__(
+        self,
+        app,
+        policies: Optional[Dict[Tuple[str, str], RateLimitPolicy]] = None,
+        shared: Optional[bool] = None,
+        idle_seconds: float = 600,
+        max_keys: int = 100_000,
+    ):
+        self.app = app
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        if shared is None:
+            from app.core import shared_state
+            shared = shared_state.multi_worker()
+        self.shared = shared
+        self.idle_seconds = idle_seconds
+        self.memory = _MemoryBuckets(idle_seconds, max_keys)
+        self._requests = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.policies.get((scope["method"], scope["path"]))
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{policy.name}:{self._identify(scope)}"
+        allowed, remaining, retry_after = await self._take(key, policy)
+
+        reset = math.ceil((policy.capacity - remaining) / policy.rate)
+        headers = [
+            (b"ratelimit-limit", str(policy.capacity).encode()),
+            (b"ratelimit-remaining", str(int(remaining)).encode()),
+            (b"ratelimit-reset", str(reset).encode()),
+            (b"ratelimit-policy", f"{policy.capacity};w={int(policy.per_seconds)}".encode()),
+        ]
+
+        if not allowed:
+            body = json.dumps({"detail": "Too many requests. Please slow down."}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": headers + [
+                    (b"retry-after", str(math.ceil(retry_after)).encode()),
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _identify(self, scope) -> str:
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                current_user = auth_utils.get_current_user_from_token(value.decode("latin-1"))
+                if current_user and current_user.get("user_id"):
+                    return f"user:{current_user['user_id']}"
+                break
+
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def _take(self, key: str, policy: RateLimitPolicy) -> Tuple[bool, float, float]:
+        if not self.shared:
+            return self.memory.take(key, policy.rate, policy.capacity)
+
+        from app.core import shared_state
+
+        self._requests += 1
+        if self._requests % 1000 == 0:
+            await run_in_threadpool(shared_state.evict_idle_buckets, self.idle_seconds)
+        return await run_in_threadpool(shared_state.take_token, key, policy.rate, policy.capacity)
@@ -0,0 +1,224 @@
+import heapq
+import json
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+# In-memory BM25 index over saved roadmaps.
+#
+# Each worker builds it once from roadmaps.json (warmed in the background at
+# startup). After that it is never rebuilt from the file: every
+# create/delete_roadmap appends the change to a log in the SQLite shared
+# state, and before each search the index applies the entries it has not
+# seen yet, whichever worker wrote them. The log keeps the last
+# CHANGE_LOG_KEEP entries; a worker that falls further behind than that (it
+# went that many writes without searching) rebuilds on its next search.
+
+K1 = 1.2
+B = 0.75
+CHANGE_LOG_KEEP = 10_000
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in",
+    "is", "it", "of", "on", "or", "the", "to", "with", "your", "you",
+}
+
+_lock = threading.RLock()
+_build_lock = threading.Lock()  # one full build at a time; later callers wait for it
+_built = False
+_last_seq = 0  # last change-log entry applied to this index
+
+_postings: Dict[str, Dict[str, int]] = {}  # term -> {roadmap_id: term frequency}
+_doc_terms: Dict[str, Counter] = {}        # roadmap_id -> term counts (for removal)
+_doc_len: Dict[str, int] = {}
+_docs: Dict[str, Dict] = {}                # roadmap_id -> summary returned in results
+_user_docs: Dict[str, set] = {}            # user_id -> roadmap ids
+_total_len = 0
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+def _searchable_text(roadmap: Dict) -> str:
+    """Title, goal, stage titles, objectives and resources"""
+    parts = [roadmap.get("title", ""), roadmap.get("user_goal", "")]
+    data = roadmap.get("roadmap_data") or {}
+    for stage in data.get("stages") or []:
+        if not isinstance(stage, dict):
+            continue
+        parts.append(str(stage.get("title", "")))
+        parts.extend(str(o) for o in stage.get("learning_objectives") or [])
+        for resource in stage.get("resources") or []:
+            if isinstance(resource, dict):
+                parts.append(str(resource.get("title", "")))
+            else:
+                parts.append(str(resource))
+    return " ".join(parts)
+
+def _index_doc(roadmap: Dict) -> Dict:
+    """The fields the index keeps for a roadmap (also what goes in the change log)"""
+    return {
+        "id": roadmap["id"],
+        "user_id": roadmap["user_id"],
+        "title": roadmap.get("title", ""),
+        "user_goal": roadmap.get("user_goal", ""),
+        "skill_level": roadmap.get("skill_level", ""),
+        "created_at": roadmap.get("created_at", ""),
+        "text": _searchable_text(roadmap),
+    }
+
+def _add(doc: Dict):
+    global _total_len
+    roadmap_id = doc["id"]
+    if roadmap_id in _doc_terms:
+        _remove(roadmap_id)
+
+    terms = Counter(tokenize(doc["text"]))
+    for term, tf in terms.items():
+        _postings.setdefault(term, {})[roadmap_id] = tf
+    _doc_terms[roadmap_id] = terms
+    _doc_len[roadmap_id] = sum(terms.values())
+    _total_len += _doc_len[roadmap_id]
+    _docs[roadmap_id] = {key: value for key, value in doc.items() if key != "text"}
+    _user_docs.setdefault(doc["user_id"], set()).add(roadmap_id)
+
+def _remove(roadmap_id: str):
+    global _total_len
+    terms = _doc_terms.pop(roadmap_id, None)
+    if terms is None:
+        return
+    for term in terms:
+        posting = _postings.get(term)
+        if posting is not None:
+            posting.pop(roadmap_id, None)
+            if not posting:
+                del _postings[term]
+    _total_len -= _doc_len.pop(roadmap_id)
+    owner = _docs.pop(roadmap_id)["user_id"]
+    _user_docs[owner].discard(roadmap_id)
+    if not _user_docs[owner]:
+        del _user_docs[owner]
+
+def rebuild():
+    """Index every roadmap on disk (one full read)"""
+    with _build_lock:
+        _rebuild()
+
+def _rebuild():
+    global _built, _last_seq, _total_len
+    from app.core import shared_state, storage
+
+    # Read the log position first: every change up to it is already in the
+    # file, and replaying later ones on top is idempotent.
+    seq = shared_state.latest_roadmap_change_seq()
+    docs = [_index_doc(r) for r in storage.load_roadmaps()["roadmaps"]]
+
+    with _lock:
+        _postings.clear()
+        _doc_terms.clear()
+        _doc_len.clear()
+        _docs.clear()
+        _user_docs.clear()
+        _total_len = 0
+        for doc in docs:
+            _add(doc)
+        _last_seq = seq
+        _built = True
+
+def _catch_up() -> bool:
+    """Apply unseen change-log entries. False if the log no longer reaches back far enough."""
+    global _last_seq
+    from app.core import shared_state
+
+    changes = shared_state.get_roadmap_changes(_last_seq)
+    if changes and changes[0][0] != _last_seq + 1:
+        return False
+    for seq, op, roadmap_id, doc in changes:
+        if op == "add":
+            _add(json.loads(doc))
+        else:
+            _remove(roadmap_id)
+        _last_seq = seq
+    return True
+
+def _ensure_fresh():
+    with _lock:
+        if _built and _catch_up():
+            return
+    with _build_lock:
+        # If the startup build was in flight we just waited for it; use it
+        with _lock:
+            if _built and _catch_up():
+                return
+        _rebuild()
+    with _lock:
+        _catch_up()
+
+def _record(op: str, roadmap_id: str, doc: Optional[Dict]):
+    global _last_seq
+    from app.core import shared_state
+
+    seq = shared_state.append_roadmap_change(
+        op, roadmap_id, json.dumps(doc) if doc else None, CHANGE_LOG_KEEP
+    )
+    with _lock:
+        # Apply our own change directly only if the index was current just
+        # before it; otherwise the next search replays the log in order.
+        if not _built or _last_seq != seq - 1:
+            return
+        if doc:
+            _add(doc)
+        else:
+            _remove(roadmap_id)
+        _last_seq = seq
+
+def add_roadmap(roadmap: Dict):
+    """Called by storage after the roadmap is written, under the storage lock"""
+    _record("add", roadmap["id"], _index_doc(roadmap))
+
+def remove_roadmap(roadmap_id: str):
+    """Called by storage after the roadmap is deleted, under the storage lock"""
+    _record("remove", roadmap_id, None)
+
+def search(query: str, user_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """
+    Rank roadmaps against `query` with BM25.
+
+    Only the postings of the query terms are visited. Pass `user_id` to limit
+    results to one user's roadmaps. Blocking (SQLite, maybe a build): call it
+    from the thread pool.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    _ensure_fresh()
+    with _lock:
+        n_docs = len(_doc_len)
+        if not n_docs:
+            return []
+        avg_len = _total_len / n_docs
+
+        scores: Dict[str, float] = {}
+        for term in terms:
+            posting = _postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            if user_id is None:
+                matches = posting.items()
+            else:
+                # Walk whichever is smaller: the user's roadmaps or the posting list
+                owned = _user_docs.get(user_id, ())
+                if len(owned) < len(posting):
+                    matches = [(r, posting[r]) for r in owned if r in posting]
+                else:
+                    matches = [(r, tf) for r, tf in posting.items() if r in owned]
+            for roadmap_id, tf in matches:
+                norm = K1 * (1 - B + B * _doc_len[roadmap_id] / avg_len)
+                scores[roadmap_id] = scores.get(roadmap_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [dict(_docs[roadmap_id], score=round(score, 4)) for roadmap_id, score in top]
@@ -0,0 +1,285 @@
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.storage import DATA_DIR
+
+# SQLite-backed state shared by every worker process on this host.
+# Stands in for Redis/Memcached until we run on more than one machine.
+STATE_DB = DATA_DIR / "shared_state.db"
+
+_conn: Optional[sqlite3.Connection] = None
+_conn_pid: Optional[int] = None
+_conn_lock = threading.Lock()
+
+def multi_worker() -> bool:
+    """
+    True when this process is one of several workers sharing the host.
+
+    gunicorn.conf.py and `python main.py` export WEB_CONCURRENCY; workers
+    spawned by `uvicorn --workers N` have a multiprocessing parent.
+    """
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        return True
+    return multiprocessing.parent_process() is not None
+
+def _connect() -> sqlite3.Connection:
+    """Return this process's connection, reopening it after a fork"""
+    global _conn, _conn_pid
+    if _conn is None or _conn_pid != os.getpid():
+        DATA_DIR.mkdir(exist_ok=True)
+        conn = sqlite3.connect(STATE_DB, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters ("
+            " name TEXT PRIMARY KEY,"
+            " value INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS daily_counters ("
+            " day TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " value INTEGER NOT NULL,"
+            " PRIMARY KEY (day, name))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " user_id TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " roadmap_id TEXT,"
+            " error TEXT,"
+            " base INTEGER NOT NULL DEFAULT 0,"
+            " next_offset INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL,"
+            " finished_at REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_chunks ("
+            " job_id TEXT NOT NULL,"
+            " pos INTEGER NOT NULL,"
+            " line TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, pos))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS roadmap_changes ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " op TEXT NOT NULL,"
+            " roadmap_id TEXT NOT NULL,"
+            " doc TEXT)"
+        )
+        _conn, _conn_pid = conn, os.getpid()
+    return _conn
+
+def take_token(key: str, rate: float, capacity: float, cost: float = 1.0) -> Tuple[bool, float, float]:
+    """
+    Spend `cost` tokens from the bucket stored under `key`.
+
+    The bucket refills at `rate` tokens per second up to `capacity`.
+    Returns (allowed, tokens_remaining, seconds_until_next_token).
+    """
+    now = time.time()
+    with _conn_lock:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                tokens = min(capacity, row[0] + (now - row[1]) * rate)
+            else:
+                tokens = capacity
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+
+            conn.execute(
+                "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    retry_after = 0.0 if tokens >= cost else (cost - tokens) / rate
+    return allowed, tokens, retry_after
+
+def evict_idle_buckets(max_idle_seconds: float) -> int:
+    """Drop buckets untouched for `max_idle_seconds` (they would be full anyway)"""
+    cutoff = time.time() - max_idle_seconds
+    with _conn_lock:
+        cursor = _connect().execute("DELETE FROM token_buckets WHERE updated_at < ?", (cutoff,))
+    return cursor.rowcount
+
+def incr_counters(deltas: Dict[str, int], day: Optional[str] = None, daily: Optional[Dict[str, int]] = None):
+    """Add `deltas` to global counters and `daily` to the counters bucketed under `day`"""
+    with _conn_lock:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name, delta in deltas.items():
+                conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?)"
+                    " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, delta),
+                )
+            for name, delta in (daily or {}).items():
+                conn.execute(
+                    "INSERT INTO daily_counters (day, name, value) VALUES (?, ?, ?)"
+                    " ON CONFLICT(day, name) DO UPDATE SET value = value + excluded.value",
+                    (day, name, delta),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def reset_counters(values: Dict[str, int], daily: Dict[Tuple[str, str], int]):
+    """Replace all counters at once (used when re-seeding from the JSON files)"""
+    with _conn_lock:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM counters")
+            conn.execute("DELETE FROM daily_counters")
+            conn.executemany("INSERT INTO counters (name, value) VALUES (?, ?)", values.items())
+            conn.executemany(
+                "INSERT INTO daily_counters (day, name, value) VALUES (?, ?, ?)",
+                [(day, name, value) for (day, name), value in daily.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def get_counters() -> Dict[str, int]:
+    with _conn_lock:
+        rows = _connect().execute("SELECT name, value FROM counters").fetchall()
+    return dict(rows)
+
+def get_daily_counters(since_day: str) -> Dict[str, Dict[str, int]]:
+    """Return {day: {name: value}} for every day >= `since_day`"""
+    with _conn_lock:
+        rows = _connect().execute(
+            "SELECT day, name, value FROM daily_counters WHERE day >= ? ORDER BY day",
+            (since_day,),
+        ).fetchall()
+    result: Dict[str, Dict[str, int]] = {}
+    for day, name, value in rows:
+        result.setdefault(day, {})[name] = value
+    return result
+
+_JOB_COLUMNS = ("id", "user_id", "status", "roadmap_id", "error", "base", "next_offset", "updated_at", "finished_at")
+
+def create_job(job_id: str, user_id: str):
+    with _conn_lock:
+        _connect().execute(
+            "INSERT INTO jobs (id, user_id, status, updated_at) VALUES (?, ?, 'running', ?)",
+            (job_id, user_id, time.time()),
+        )
+
+def append_job_chunk(job_id: str, line: str, max_chunks: int) -> int:
+    """Append a chunk, dropping the oldest beyond `max_chunks`. Returns its offset."""
+    with _conn_lock:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            offset, base = conn.execute(
+                "SELECT next_offset, base FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO job_chunks (job_id, pos, line) VALUES (?, ?, ?)",
+                (job_id, offset, line),
+            )
+            if offset + 1 - base > max_chunks:
+                base = offset + 1 - max_chunks
+                conn.execute("DELETE FROM job_chunks WHERE job_id = ? AND pos < ?", (job_id, base))
+            conn.execute(
+                "UPDATE jobs SET next_offset = ?, base = ?, updated_at = ? WHERE id = ?",
+                (offset + 1, base, time.time(), job_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return offset
+
+def finish_job(job_id: str, status: str, roadmap_id: Optional[str], error: Optional[str]):
+    now = time.time()
+    with _conn_lock:
+        _connect().execute(
+            "UPDATE jobs SET status = ?, roadmap_id = ?, error = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+            (status, roadmap_id, error, now, now, job_id),
+        )
+
+def get_job(job_id: str) -> Optional[Dict]:
+    with _conn_lock:
+        row = _connect().execute(
+            f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+    return dict(zip(_JOB_COLUMNS, row)) if row else None
+
+def read_job_chunks(job_id: str, offset: int, limit: int) -> List[Tuple[int, str]]:
+    with _conn_lock:
+        return _connect().execute(
+            "SELECT pos, line FROM job_chunks WHERE job_id = ? AND pos >= ? ORDER BY pos LIMIT ?",
+            (job_id, offset, limit),
+        ).fetchall()
+
+def delete_expired_jobs(finished_before: float, stale_before: float) -> int:
+    """Drop jobs that finished before `finished_before` or stopped updating before `stale_before`"""
+    with _conn_lock:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE finished_at < ? OR (finished_at IS NULL AND updated_at < ?)",
+                (finished_before, stale_before),
+            )]
+            for job_id in expired:
+                conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return len(expired)
+
+def append_roadmap_change(op: str, roadmap_id: str, doc: Optional[str], keep: int) -> int:
+    """Log a roadmap add/remove for other workers' indexes. Returns its sequence number."""
+    with _conn_lock:
+        conn = _connect()
+        seq = conn.execute(
+            "INSERT INTO roadmap_changes (op, roadmap_id, doc) VALUES (?, ?, ?)",
+            (op, roadmap_id, doc),
+        ).lastrowid
+        if seq % 1000 == 0:
+            conn.execute("DELETE FROM roadmap_changes WHERE seq <= ?", (seq - keep,))
+    return seq
+
+def get_roadmap_changes(after_seq: int) -> List[Tuple[int, str, str, Optional[str]]]:
+    with _conn_lock:
+        return _connect().execute(
+            "SELECT seq, op, roadmap_id, doc FROM roadmap_changes WHERE seq > ? ORDER BY seq",
+            (after_seq,),
+        ).fetchall()
+
+def latest_roadmap_change_seq() -> int:
+    with _conn_lock:
+        row = _connect().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'roadmap_changes'"
+        ).fetchone()
+    return row[0] if row else 0
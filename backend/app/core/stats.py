@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Usage counters for the admin dashboard.
+#
+# Storage mutations and generation events push small deltas into the shared
+# SQLite state, so reading the stats never touches the JSON files. Counters
+# are seeded once from the files by init_stats() (or rebuilt with rebuild()).
+
+TOTALS = (
+    "users_total",
+    "admins_total",
+    "blocked_users",
+    "agent_disabled_users",
+    "roadmaps_total",
+    "generations_total",
+    "credits_consumed",
+)
+DAILY = ("signups", "roadmaps", "generations", "credits_consumed")
+
+def _today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+def _user_flags(user: Dict) -> Dict[str, int]:
+    return {
+        "users_total": 1,
+        "admins_total": int(bool(user.get("is_admin", False))),
+        "blocked_users": int(bool(user.get("is_blocked", False))),
+        "agent_disabled_users": int(not user.get("is_agent_enabled", True)),
+    }
+
+def _incr(deltas: Dict[str, int], daily: Optional[Dict[str, int]] = None):
+    from app.core import shared_state
+    shared_state.incr_counters(deltas, _today(), daily)
+
+# Events (called by storage and the roadmap routes)
+
+def user_created(user: Dict):
+    _incr(_user_flags(user), {"signups": 1})
+
+def user_updated(before: Dict, after: Dict):
+    old, new = _user_flags(before), _user_flags(after)
+    deltas = {name: new[name] - old[name] for name in new if new[name] != old[name]}
+    if deltas:
+        _incr(deltas)
+
+def user_deleted(user: Dict):
+    _incr({name: -value for name, value in _user_flags(user).items()})
+
+def roadmap_created():
+    _incr({"roadmaps_total": 1}, {"roadmaps": 1})
+
+def roadmap_deleted():
+    _incr({"roadmaps_total": -1})
+
+def credit_consumed():
+    _incr({"credits_consumed": 1}, {"credits_consumed": 1})
+
+def generation_started():
+    _incr({"generations_total": 1}, {"generations": 1})
+
+# Seeding
+
+def rebuild():
+    """Recompute counters from the JSON files (one full scan of each)"""
+    from app.core import shared_state, storage
+
+    totals = {name: 0 for name in TOTALS}
+    daily: Dict = {}
+
+    for user in storage.load_users()["users"]:
+        for name, value in _user_flags(user).items():
+            totals[name] += value
+        day = user.get("created_at", "")[:10]
+        if day:
+            daily[(day, "signups")] = daily.get((day, "signups"), 0) + 1
+
+    for roadmap in storage.load_roadmaps()["roadmaps"]:
+        totals["roadmaps_total"] += 1
+        day = roadmap.get("created_at", "")[:10]
+        if day:
+            daily[(day, "roadmaps")] = daily.get((day, "roadmaps"), 0) + 1
+
+    # Generation and credit history was never recorded before counters existed
+    shared_state.reset_counters(totals, daily)
+
+def init_stats():
+    """Seed the counters on first run; call under storage.locked()"""
+    from app.core import shared_state
+    if not shared_state.get_counters():
+        rebuild()
+
+# Reads
+
+def get_stats(days: int = 30) -> Dict:
+    """Current totals plus a per-day rollup of the last `days` days"""
+    from app.core import shared_state
+
+    counters = shared_state.get_counters()
+    totals = {name: counters.get(name, 0) for name in TOTALS}
+
+    today = datetime.utcnow().date()
+    first_day = today - timedelta(days=days - 1)
+    rollups = shared_state.get_daily_counters(first_day.isoformat())
+
+    daily: List[Dict] = []
+    for offset in range(days):
+        day = (first_day + timedelta(days=offset)).isoformat()
+        values = rollups.get(day, {})
+        daily.append({"day": day, **{name: values.get(name, 0) for name in DAILY}})
+
+    users = totals["users_total"]
+    return {
+        **totals,
+        "roadmaps_per_user": round(totals["roadmaps_total"] / users, 2) if users else 0.0,
+        "daily": daily,
+    }
@@ -1,42 +1,116 @@
 import json
 import os
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Optional
 import uuid
 from datetime import datetime
 
-# Data directory
-DATA_DIR = Path(__file__).parent.parent.parent / "data"
-DATA_DIR.mkdir(exist_ok=True)
+from app.core import search_index, stats
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Data directory (APP_DATA_DIR overrides it, e.g. for benchmarks)
+DATA_DIR = Path(os.getenv("APP_DATA_DIR") or Path(__file__).parent.parent.parent / "data")
 
 USERS_FILE = DATA_DIR / "users.json"
 ROADMAPS_FILE = DATA_DIR / "roadmaps.json"
+LOCK_FILE = DATA_DIR / ".storage.lock"
+
+# Cross-process write lock. Every read-modify-write of the JSON files runs
+# under it so several uvicorn/gunicorn workers can share the data directory.
+# Plain reads stay lock-free because writes replace the file atomically. On
+# Windows a replace (or open) can briefly fail with PermissionError while
+# another process has the file open, so both sides retry (_retry_sharing).
+_thread_lock = threading.RLock()
+_lock_state = threading.local()
+
+@contextmanager
+def locked():
+    """Hold the exclusive storage lock (re-entrant within a thread)"""
+    depth = getattr(_lock_state, "depth", 0)
+    if depth:
+        _lock_state.depth = depth + 1
+        try:
+            yield
+        finally:
+            _lock_state.depth -= 1
+        return
+
+    with _thread_lock:
+        with open(LOCK_FILE, "a+") as lock_fd:
+            if fcntl:
+                fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_fd.seek(0)
+                msvcrt.locking(lock_fd.fileno(), msvcrt.LK_LOCK, 1)
+            _lock_state.depth = 1
+            try:
+                yield
+            finally:
+                _lock_state.depth = 0
+                if fcntl:
+                    fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_fd.seek(0)
+                    msvcrt.locking(lock_fd.fileno(), msvcrt.LK_UNLCK, 1)
+
+SHARING_RETRIES = 20
+
+def _retry_sharing(fn, *args):
+    """Run fn, retrying Windows sharing violations (PermissionError) with backoff"""
+    for attempt in range(SHARING_RETRIES):
+        try:
+            return fn(*args)
+        except PermissionError:
+            if fcntl or attempt == SHARING_RETRIES - 1:
+                raise
+            time.sleep(0.005 * (attempt + 1))
+
+def _read_json(path: Path) -> Dict:
+    def read():
+        with open(path, 'r') as f:
+            return json.load(f)
+    return _retry_sharing(read)
 
-# Initialize files if they don't exist
+def _write_json(path: Path, data: Dict):
+    """Write atomically so concurrent readers never see a half-written file"""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    _retry_sharing(os.replace, tmp_path, path)
+
+# Initialize files if they don't exist (called from the app lifespan, not on import)
 def init_storage():
-    if not USERS_FILE.exists():
-        save_users({"users": []})
-    if not ROADMAPS_FILE.exists():
-        save_roadmaps({"roadmaps": []})
+    DATA_DIR.mkdir(exist_ok=True)
+    with locked():
+        if not USERS_FILE.exists():
+            save_users({"users": []})
+        if not ROADMAPS_FILE.exists():
+            save_roadmaps({"roadmaps": []})
 
 # Users
 def load_users() -> Dict:
     try:
-        with open(USERS_FILE, 'r') as f:
-            data = json.load(f)
-            # Add missing fields to existing users (Backwards Compatibility)
-            for user in data["users"]:
-                if "credits" not in user:
-                    user["credits"] = -1 # Infinite for existing users
-                if "is_agent_enabled" not in user:
-                    user["is_agent_enabled"] = True
-            return data
+        data = _read_json(USERS_FILE)
+        # Add missing fields to existing users (Backwards Compatibility)
+        for user in data["users"]:
+            if "credits" not in user:
+                user["credits"] = -1 # Infinite for existing users
+            if "is_agent_enabled" not in user:
+                user["is_agent_enabled"] = True
+        return data
     except:
         return {"users": []}
 
 def save_users(data: Dict):
-    with open(USERS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    _write_json(USERS_FILE, data)
 
 def get_user_by_email(email: str) -> Optional[Dict]:
     data = load_users()
@@ -52,8 +126,8 @@ def get_user_by_id(user_id: str) -> Optional[Dict]:
             return user
     return None
 
-def create_user(email: str, password_hash: str, is_admin: bool = False) -> Dict:
-    data = load_users()
+def create_user(email: str, password_hash: str, is_admin: bool = False) -> Optional[Dict]:
+    """Create a user. Returns None if the email is already registered."""
     user = {
         "id": str(uuid.uuid4()),
         "email": email,
@@ -64,26 +138,55 @@ def create_user(email: str, password_hash: str, is_admin: bool = False) -> Dict:
         "is_agent_enabled": True,
         "created_at": datetime.utcnow().isoformat()
     }
-    data["users"].append(user)
-    save_users(data)
+    with locked():
+        data = load_users()
+        # Re-check under the lock: another worker may have registered it since the caller looked
+        if any(u["email"] == email for u in data["users"]):
+            return None
+        data["users"].append(user)
+        save_users(data)
+        stats.user_created(user)
     return user
 
 def update_user(user_id: str, updates: Dict) -> Optional[Dict]:
-    data = load_users()
-    for i, user in enumerate(data["users"]):
-        if user["id"] == user_id:
-            data["users"][i].update(updates)
-            save_users(data)
-            return data["users"][i]
+    with locked():
+        data = load_users()
+        for i, user in enumerate(data["users"]):
+            if user["id"] == user_id:
+                before = dict(user)
+                data["users"][i].update(updates)
+                save_users(data)
+                stats.user_updated(before, data["users"][i])
+                return data["users"][i]
     return None
 
+def consume_credit(user_id: str) -> bool:
+    """Atomically spend one credit. Returns False if the user has none left."""
+    with locked():
+        data = load_users()
+        for user in data["users"]:
+            if user["id"] == user_id:
+                credits = user.get("credits", -1)
+                if credits == -1:
+                    return True
+                if credits <= 0:
+                    return False
+                user["credits"] = credits - 1
+                save_users(data)
+                stats.credit_consumed()
+                return True
+    return False
+
 def delete_user(user_id: str) -> bool:
-    data = load_users()
-    original_len = len(data["users"])
-    data["users"] = [u for u in data["users"] if u["id"] != user_id]
-    if len(data["users"]) < original_len:
-        save_users(data)
-        return True
+    with locked():
+        data = load_users()
+        removed = [u for u in data["users"] if u["id"] == user_id]
+        data["users"] = [u for u in data["users"] if u["id"] != user_id]
+        if removed:
+            save_users(data)
+            for user in removed:
+                stats.user_deleted(user)
+            return True
     return False
 
 def get_all_users() -> List[Dict]:
@@ -93,17 +196,14 @@ def get_all_users() -> List[Dict]:
 # Roadmaps
 def load_roadmaps() -> Dict:
     try:
-        with open(ROADMAPS_FILE, 'r') as f:
-            return json.load(f)
+        return _read_json(ROADMAPS_FILE)
     except:
         return {"roadmaps": []}
 
 def save_roadmaps(data: Dict):
-    with open(ROADMAPS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    _write_json(ROADMAPS_FILE, data)
 
 def create_roadmap(user_id: str, title: str, user_goal: str, skill_level: str, roadmap_data: Dict) -> Dict:
-    data = load_roadmaps()
     roadmap = {
         "id": str(uuid.uuid4()),
         "user_id": user_id,
@@ -113,8 +213,12 @@ def create_roadmap(user_id: str, title: str, user_goal: str, skill_level: str, r
         "roadmap_data": roadmap_data,
         "created_at": datetime.utcnow().isoformat()
     }
-    data["roadmaps"].append(roadmap)
-    save_roadmaps(data)
+    with locked():
+        data = load_roadmaps()
+        data["roadmaps"].append(roadmap)
+        save_roadmaps(data)
+        search_index.add_roadmap(roadmap)
+        stats.roadmap_created()
     return roadmap
 
 def get_roadmaps_by_user(user_id: str) -> List[Dict]:
@@ -129,13 +233,13 @@ def get_roadmap_by_id(roadmap_id: str) -> Optional[Dict]:
     return None
 
 def delete_roadmap(roadmap_id: str, user_id: str) -> bool:
-    data = load_roadmaps()
-    original_len = len(data["roadmaps"])
-    data["roadmaps"] = [r for r in data["roadmaps"] if not (r["id"] == roadmap_id and r["user_id"] == user_id)]
-    if len(data["roadmaps"]) < original_len:
-        save_roadmaps(data)
-        return True
+    with locked():
+        data = load_roadmaps()
+        original_len = len(data["roadmaps"])
+        data["roadmaps"] = [r for r in data["roadmaps"] if not (r["id"] == roadmap_id and r["user_id"] == user_id)]
+        if len(data["roadmaps"]) < original_len:
+            save_roadmaps(data)
+            search_index.remove_roadmap(roadmap_id)
+            stats.roadmap_deleted()
+            return True
     return False
-
-# Initialize on import
-init_storage()
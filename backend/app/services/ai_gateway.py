@@ -2,23 +2,26 @@ import asyncio
 import traceback
 import os
 import json
+from functools import lru_cache
 
 # FIX: Disable SSL key logging to prevent Windows permission errors
 os.environ["SSLKEYLOGFILE"] = ""
 
-from openai import OpenAI
-from dotenv import load_dotenv
+MODEL_ID = "moonshotai/Kimi-K2-Instruct-0905"
 
-load_dotenv()
+@lru_cache(maxsize=1)
+def get_client():
+    """Build the OpenAI client on first generation, keeping the SDK import off the startup path"""
+    from openai import OpenAI
+    from dotenv import load_dotenv
 
-HF_TOKEN = os.getenv("HF_TOKEN")
+    load_dotenv()
 
-# Using OpenAI-compatible HF Router with guaranteed-working model
-client = OpenAI(
-    base_url="https://router.huggingface.co/v1",
-    api_key=HF_TOKEN,
-)
-MODEL_ID = "moonshotai/Kimi-K2-Instruct-0905"
+    # Using OpenAI-compatible HF Router with guaranteed-working model
+    return OpenAI(
+        base_url="https://router.huggingface.co/v1",
+        api_key=os.getenv("HF_TOKEN"),
+    )
 
 async def generate_roadmap_stream(user_goal: str, skill_level: str):
     prompt = f"""
@@ -71,7 +74,7 @@ async def generate_roadmap_stream(user_goal: str, skill_level: str):
         loop = asyncio.get_event_loop()
         response = await loop.run_in_executor(
             None,
-            lambda: client.chat.completions.create(
+            lambda: get_client().chat.completions.create(
                 model=MODEL_ID,
                 messages=[
                     {
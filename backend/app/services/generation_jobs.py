@@ -0,0 +1,154 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.services.ai_gateway import generate_roadmap_stream
+from app.core import shared_state, storage
+
+# Generation runs in the worker that accepted the request, but job status and
+# the chunk buffer live in the SQLite shared state, so any worker can report
+# on a job or resume its stream. SQLite (and storage) calls run in the thread
+# pool: a write lock held by another worker must not stall the event loop.
+MAX_BUFFERED_CHUNKS = 2000
+JOB_TTL_SECONDS = 60 * 30
+JOB_STALE_SECONDS = 60 * 10  # running job with no progress: its worker died
+POLL_SECONDS = 0.1
+READ_BATCH = 500
+
+class GenerationJob:
+    """Producer side of a job; exists only in the worker running it"""
+
+    def __init__(self, user_id: str, user_goal: str, skill_level: str, auto_save: bool):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.user_goal = user_goal
+        self.skill_level = skill_level
+        self.auto_save = auto_save
+        self.roadmap_id: Optional[str] = None
+        self.error: Optional[str] = None
+        self.output_parts = []
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": "running",
+            "roadmap_id": None,
+            "error": None,
+            "next_offset": 0,
+        }
+
+    async def _append(self, line: str):
+        await run_in_threadpool(shared_state.append_job_chunk, self.id, line, MAX_BUFFERED_CHUNKS)
+
+        # Keep the model output (minus debug lines) for auto-save
+        if line.startswith("0:"):
+            text = json.loads(line[2:])
+            if not text.startswith("[DEBUG]"):
+                self.output_parts.append(text)
+
+    async def run(self):
+        status = "failed"
+        try:
+            failed = False
+            async for line in generate_roadmap_stream(self.user_goal, self.skill_level):
+                if line.startswith('0:"[DEBUG] Exception'):
+                    failed = True
+                await self._append(line.rstrip("\n"))
+
+            if failed:
+                self.error = "Generation failed; fallback mock data was streamed"
+            else:
+                if self.auto_save:
+                    await run_in_threadpool(self._save)
+                status = "completed"
+        except asyncio.CancelledError:
+            self.error = "Job was cancelled"
+            raise
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            # Always settle the job so streams end and eviction can drop it
+            await run_in_threadpool(shared_state.finish_job, self.id, status, self.roadmap_id, self.error)
+
+    def _save(self):
+        text = "".join(self.output_parts)
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end == -1:
+            self.error = "Could not find roadmap JSON in output"
+            return
+        try:
+            roadmap_data = json.loads(text[start:end + 1])
+        except ValueError as e:
+            self.error = f"Could not parse roadmap JSON: {e}"
+            return
+
+        roadmap = storage.create_roadmap(
+            user_id=self.user_id,
+            title=roadmap_data.get("roadmap_title", self.user_goal),
+            user_goal=self.user_goal,
+            skill_level=self.skill_level,
+            roadmap_data=roadmap_data,
+        )
+        self.roadmap_id = roadmap["id"]
+
+# Keep references so running tasks aren't garbage collected
+_tasks = set()
+
+async def start_job(user_id: str, user_goal: str, skill_level: str, auto_save: bool = False) -> GenerationJob:
+    """Start generating in the background; survives client disconnects"""
+    now = time.time()
+    await run_in_threadpool(shared_state.delete_expired_jobs, now - JOB_TTL_SECONDS, now - JOB_STALE_SECONDS)
+
+    job = GenerationJob(user_id, user_goal, skill_level, auto_save)
+    await run_in_threadpool(shared_state.create_job, job.id, user_id)
+    task = asyncio.create_task(job.run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+async def get_job(job_id: str) -> Optional[Dict]:
+    """Current job state as seen from any worker, or None if unknown/evicted"""
+    job = await run_in_threadpool(shared_state.get_job, job_id)
+    if job and job["status"] == "running" and job["updated_at"] < time.time() - JOB_STALE_SECONDS:
+        job["status"] = "failed"
+        job["error"] = "Job worker stopped responding"
+    return job
+
+async def stream_job(job_id: str, offset: int = 0):
+    """
+    Yield buffered and live chunks as SSE events starting at `offset`.
+
+    Each event's id is its offset, so a client can resume by sending the
+    last id it received as `Last-Event-ID`. Callers must check that
+    `offset >= job["base"]` first.
+    """
+    while True:
+        job = await get_job(job_id)
+        if job is None:
+            return
+
+        chunks = await run_in_threadpool(shared_state.read_job_chunks, job_id, offset, READ_BATCH)
+        if offset < job["base"] or (chunks and chunks[0][0] != offset):
+            # Reader fell behind a full buffer
+            yield f"event: expired\ndata: {json.dumps(_public(job))}\n\n"
+            return
+
+        for chunk_offset, line in chunks:
+            yield f"id: {chunk_offset}\ndata: {line}\n\n"
+            offset = chunk_offset + 1
+        if chunks:
+            continue
+
+        # Status was read before the chunks, so a finished job is fully drained
+        if job["status"] != "running":
+            yield f"event: done\ndata: {json.dumps(_public(job))}\n\n"
+            return
+
+        await asyncio.sleep(POLL_SECONDS)
+
+def _public(job: Dict) -> Dict:
+    return {key: job[key] for key in ("id", "status", "roadmap_id", "error", "next_offset")}
@@ -0,0 +1,65 @@
+"""
+Cold-start benchmark for API workers.
+
+Spawns fresh interpreters and times (1) `import main` and (2) running the
+lifespan startup, which is what every new gunicorn/uvicorn worker pays.
+Each run gets an empty temporary APP_DATA_DIR, so it measures a true first
+start (data files, stats seeding, admin bcrypt hash) and never touches
+backend/data.
+
+    python bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+
+PROBE = """
+import asyncio, os, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+async def run():
+    async with main.lifespan(main.app):
+        pass
+asyncio.run(run())
+t2 = time.perf_counter()
+heavy = [m for m in ("openai", "supabase") if m in __import__("sys").modules]
+print(f"{(t1 - t0) * 1000:.2f} {(t2 - t1) * 1000:.2f} {','.join(heavy) or '-'}")
+"""
+
+def measure(runs: int):
+    imports, startups = [], []
+    heavy = "-"
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="bench-startup-") as data_dir:
+            env = dict(os.environ, APP_DATA_DIR=data_dir)
+            env.pop("APP_BOOTSTRAPPED", None)
+            out = subprocess.run(
+                [sys.executable, "-c", PROBE],
+                cwd=BACKEND_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip().splitlines()[-1]
+        import_ms, startup_ms, heavy = out.split()
+        imports.append(float(import_ms))
+        startups.append(float(startup_ms))
+    return imports, startups, heavy
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    imports, startups, heavy = measure(runs)
+
+    print(f"--- Worker cold start ({runs} runs) ---")
+    print(f"import main : median {statistics.median(imports):8.2f} ms  max {max(imports):8.2f} ms")
+    print(f"lifespan    : median {statistics.median(startups):8.2f} ms  max {max(startups):8.2f} ms")
+    print(f"heavy SDKs loaded at startup: {heavy}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+# Multi-worker deployment:
+#   gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Workers inherit this and switch rate limits etc. to the shared store
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120  # roadmap generation waits on the upstream LLM
+
+def on_starting(server):
+    """Runs once in the master before any worker is forked"""
+    from main import bootstrap
+    bootstrap()
@@ -1,20 +1,57 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import roadmap, auth, admin
+from app.core import storage, stats, search_index
+from app.core.rate_limit import RateLimitMiddleware
 
-app = FastAPI(title="AI Upskilling Platform API", version="0.1.0")
+# Set once the one-time setup has run in a parent process (gunicorn master or
+# `python main.py`), so forked/spawned workers don't repeat it.
+BOOTSTRAP_ENV = "APP_BOOTSTRAPPED"
+
+def bootstrap():
+    """Create data files and the admin user. Safe to call from several processes."""
+    storage.init_storage()
+    with storage.locked():
+        # Seed counters before init_admin records any events
+        stats.init_stats()
+        auth.init_admin()
+    os.environ[BOOTSTRAP_ENV] = "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # All one-time setup lives here so importing the app stays side-effect free
+    if not os.environ.get(BOOTSTRAP_ENV):
+        bootstrap()
+    # Build this worker's search index off the request path
+    app.state.search_index_build = asyncio.get_running_loop().run_in_executor(None, search_index.rebuild)
+    app.state.search_index_build.add_done_callback(_report_index_build)
+    yield
+
+def _report_index_build(future):
+    exc = None if future.cancelled() else future.exception()
+    if exc:
+        print(f"❌ Search index build failed (first search will retry): {exc!r}")
+
+app = FastAPI(title="AI Upskilling Platform API", version="0.1.0", lifespan=lifespan)
 
 # CORS Configuration
 origins = [
     "http://localhost:3000",  # Frontend
 ]
 
+# Added before CORS so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy", "Retry-After"],
 )
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -31,4 +68,10 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        # Multi-worker mode: run setup here once, then fork workers (no reload)
+        bootstrap()
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)